@@ -0,0 +1,212 @@
+"""Modèle pur du comparateur de plateformes (aucune dépendance Streamlit).
+
+Regroupe le DTO Platform, la conversion SoA, les solveurs net -> prix
+public et les helpers de formatage : importable tel quel par des tests ou
+des scripts hors UI sans payer l'import de streamlit.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Literal, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+FeeMode = Literal["percentage", "fixed"]
+
+
+@lru_cache(maxsize=2048)
+def _client_fee(mode: FeeMode, value: float, floor: float, cap: Optional[float], price: float) -> float:
+    """Frais client en € — fonction pure mémoïsée des champs Platform + prix.
+
+    Les mêmes couples (plateforme, prix) sont revisités entre les rendus ;
+    les appels répétés se réduisent à une consultation de dict.
+    """
+    if mode == "percentage":
+        fee = max(price * (value / 100.0), float(floor or 0.0))
+        if cap is not None:
+            fee = min(fee, float(cap))
+        return fee
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class Platform:
+    name: str
+    host_commission_pct: float          # % côté hôte
+    client_fee_mode: FeeMode            # "percentage" ou "fixed"
+    client_fee_value: float             # % si percentage, € si fixed
+    client_fee_floor_eur: float = 0.0   # plancher quand percentage
+    client_fee_cap_eur: Optional[float] = None  # plafond quand percentage (None = pas de plafond)
+    # Coefficients dérivés figés à la construction (évite de rediviser à chaque appel)
+    _host_factor: float = field(init=False, repr=False, compare=False, default=0.0)
+    _client_rate: float = field(init=False, repr=False, compare=False, default=0.0)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_host_factor", 1.0 - self.host_commission_pct / 100.0)
+        object.__setattr__(self, "_client_rate", self.client_fee_value / 100.0)
+
+    def client_fee_amount(self, sale_price: float) -> float:
+        """Frais client en € selon le mode, avec plancher/plafond éventuels."""
+        return _client_fee(self.client_fee_mode, self.client_fee_value,
+                           self.client_fee_floor_eur, self.client_fee_cap_eur, sale_price)
+
+    def base_before_client_fees(self, sale_price: float) -> float:
+        return sale_price - self.client_fee_amount(sale_price)
+
+    def host_net(self, sale_price: float) -> float:
+        base = self.base_before_client_fees(sale_price)
+        return base * self._host_factor
+
+
+class PlatformArrays(NamedTuple):
+    """Représentation SoA (structure of arrays) des plateformes pour le calcul vectorisé.
+
+    `Platform` reste le DTO de configuration ; les calculs numériques
+    travaillent sur ces tableaux parallèles (plafond absent -> np.inf).
+    """
+    names: List[str]
+    host_pct: np.ndarray
+    is_pct: np.ndarray
+    fee_value: np.ndarray
+    floor: np.ndarray
+    cap: np.ndarray
+
+
+def _platforms_to_arrays(platforms: List[Platform]) -> PlatformArrays:
+    return PlatformArrays(
+        names=[p.name for p in platforms],
+        host_pct=np.array([p.host_commission_pct for p in platforms]),
+        is_pct=np.array([p.client_fee_mode == "percentage" for p in platforms]),
+        fee_value=np.array([p.client_fee_value for p in platforms]),
+        floor=np.array([float(p.client_fee_floor_eur or 0.0) for p in platforms]),
+        cap=np.array([float(p.client_fee_cap_eur) if p.client_fee_cap_eur is not None else np.inf
+                      for p in platforms]),
+    )
+
+
+# --- Inversion pour retrouver P (prix public) à partir du net N ---
+
+def _solve_price_from_net_percentage(N: float, h: float, cp: float, floor: float, cap: Optional[float]) -> float:
+    """Résout P pour N avec frais client en %, incluant plancher/plafond.
+    Régimes testés: floor, plafond, proportionnel. On retourne le P cohérent minimal.
+    Pur scalaire : le meilleur candidat est suivi via une sentinelle inf,
+    sans liste de candidats, tuples ni générateur.
+    """
+    best = float("inf")
+    # 1) plancher actif
+    P_floor = N / (1 - h) + floor
+    if cp * P_floor <= floor + 1e-9:
+        best = P_floor
+    # 2) plafond actif
+    if cap is not None:
+        P_cap = N / (1 - h) + cap
+        if cp * P_cap >= cap - 1e-9 and P_cap < best:
+            best = P_cap
+    # 3) proportionnel
+    denom = (1 - cp) * (1 - h)
+    if denom <= 0:
+        denom = 1e-12
+    P_pct = N / denom
+    if (cp * P_pct >= floor - 1e-9) and (cap is None or cp * P_pct <= cap + 1e-9) and P_pct < best:
+        best = P_pct
+    return best if best != float("inf") else max(P_floor, P_pct)
+
+
+def _solve_prices_from_net(arr: PlatformArrays, net: float) -> np.ndarray:
+    """Version vectorisée de price_from_net sur toutes les plateformes à la fois.
+
+    Même logique de régimes (plancher / plafond / proportionnel / forfait)
+    que les fonctions scalaires, exprimée en tableaux NumPy : les candidats
+    invalides valent np.inf et on prend le minimum.
+    """
+    h = arr.host_pct / 100.0
+    cp = np.where(arr.is_pct, arr.fee_value / 100.0, 0.0)
+    one_minus_h = 1.0 - h
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base = np.where(one_minus_h != 0, net / one_minus_h, np.inf)
+        # frais fixe f : P = f + N/(1-h)
+        P_fixed = arr.fee_value + base
+        # 1) plancher actif
+        P_floor = base + arr.floor
+        ok_floor = cp * P_floor <= arr.floor + 1e-9
+        # 2) plafond actif (cap = inf quand pas de plafond)
+        P_cap = base + np.where(np.isfinite(arr.cap), arr.cap, 0.0)
+        ok_cap = np.isfinite(arr.cap) & (cp * P_cap >= arr.cap - 1e-9)
+        # 3) proportionnel
+        denom = (1.0 - cp) * one_minus_h
+        denom = np.where(denom <= 0, 1e-12, denom)
+        P_pct = net / denom
+        ok_pct = (cp * P_pct >= arr.floor - 1e-9) & (cp * P_pct <= arr.cap + 1e-9)
+    best = np.minimum(
+        np.minimum(np.where(ok_floor, P_floor, np.inf), np.where(ok_cap, P_cap, np.inf)),
+        np.where(ok_pct, P_pct, np.inf),
+    )
+    best = np.where(np.isinf(best), np.maximum(P_floor, P_pct), best)
+    return np.where(arr.is_pct, best, P_fixed)
+
+
+def price_from_net(platform: Platform, net: float) -> float:
+    h = platform.host_commission_pct / 100.0
+    if platform.client_fee_mode == "percentage":
+        # Cas dégénéré fréquent (Airbnb host-only, Booking.com, Holidu) :
+        # 0 % de frais client sans plancher ni plafond -> P = N/(1-h) direct,
+        # inutile de dérouler les régimes du solveur.
+        if (platform.client_fee_value == 0.0 and not platform.client_fee_floor_eur
+                and platform.client_fee_cap_eur is None):
+            return net / (1 - h) if h != 1 else float("inf")
+        cp = platform.client_fee_value / 100.0
+        floor = float(platform.client_fee_floor_eur or 0.0)
+        cap = float(platform.client_fee_cap_eur) if platform.client_fee_cap_eur is not None else None
+        return _solve_price_from_net_percentage(net, h, cp, floor, cap)
+    else:
+        # frais fixe f : N = (P - f)*(1-h)  =>  P = f + N/(1-h)
+        denom = (1 - h)
+        return (platform.client_fee_value + net / denom) if denom != 0 else float("inf")
+
+
+# ==========================
+#  Config (plateformes figées, sauf GDF)
+# ==========================
+GDF_DEFAULT = Platform(
+    name="Gîtes de France",
+    host_commission_pct=15.0,
+    client_fee_mode="fixed",
+    client_fee_value=15.0,
+)
+
+# Tuple (et non liste) : construit une fois à l'import, immuable, et les
+# Platform gelés sont hashables — utilisables directement en clé de cache.
+FIXED_PLATFORMS: Tuple[Platform, ...] = (
+    Platform("Tripadvisor / FlipKey", host_commission_pct=3.0,  client_fee_mode="percentage", client_fee_value=12.0),
+    Platform("Airbnb host-only",      host_commission_pct=15.5, client_fee_mode="percentage", client_fee_value=0.0),
+    Platform("Vrbo / Abritel",        host_commission_pct=8.0,  client_fee_mode="percentage", client_fee_value=14.26),
+    Platform("Airbnb split",          host_commission_pct=3.0,  client_fee_mode="percentage", client_fee_value=15.0),
+    Platform("Booking.com",           host_commission_pct=17.0, client_fee_mode="percentage", client_fee_value=0.0),
+    Platform("Holidu",                host_commission_pct=25.0, client_fee_mode="percentage", client_fee_value=0.0),
+)
+
+# Clé de cache compacte pour st.cache_data (tuple de champs, stable et picklable)
+PlatformSpec = Tuple[str, float, str, float, float, Optional[float]]
+
+
+def _platform_spec(platforms: List[Platform]) -> Tuple[PlatformSpec, ...]:
+    return tuple(
+        (p.name, p.host_commission_pct, p.client_fee_mode, p.client_fee_value,
+         p.client_fee_floor_eur, p.client_fee_cap_eur)
+        for p in platforms
+    )
+
+
+# Format monétaire français : "1,234.56" -> "1.234,56".
+# str.translate substitue en une seule passe simultanée, l'échange ,/. est donc direct.
+_FR_TRANS = str.maketrans(",.", ".,")
+
+
+@lru_cache(maxsize=4096)
+def _fr_money(v: float) -> str:
+    """Montant au format français ; les valeurs se répètent d'un rendu à l'autre."""
+    return f"{v:,.2f}".translate(_FR_TRANS)
+
+
+def _fmt_fr(values: np.ndarray) -> List[str]:
+    """Formate une colonne de flottants en une seule passe (format français)."""
+    return [_fr_money(v) for v in values]
@@ -1,10 +1,21 @@
-import math
-from dataclasses import dataclass
-from typing import List, Dict, Literal, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from model import (
+    FIXED_PLATFORMS,
+    GDF_DEFAULT,
+    FeeMode,
+    Platform,
+    PlatformSpec,
+    _fmt_fr,
+    _platform_spec,
+    _platforms_to_arrays,
+    _solve_prices_from_net,
+)
+
 # ==========================
 #  🎨 Thème & Styles GDF (Raleway + Vert #4BAB77)
 # ==========================
@@ -12,7 +23,47 @@ GDF_GREEN = "#4BAB77"
 GDF_DARK = "#00653F"  # pour sélecteurs
 GDF_TEXT_ON_GREEN = "#FFFFFF"  # texte noir dans les pastilles, cf. maquette
 
-CUSTOM_CSS = f"""
+# Overrides CSS ciblés, statiques (pas de f-string -> pas besoin de doubler les accolades)
+_OVERRIDES_CSS = """
+<style>
+/* Couleur primaire Streamlit (impacte radio/checkbox/accents) */
+:root { --primary-color: #00653F; }
+
+/* Accent sélecteurs (dropdowns) dans la sidebar */
+section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] > div { border-color:#00653F !important; box-shadow:0 0 0 1px #00653F1A !important; }
+section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] > div:focus { box-shadow:0 0 0 2px #00653F66 !important; border-color:#00653F !important; }
+section[data-testid="stSidebar"] .stSelectbox svg { color:#00653F !important; fill:#00653F !important; }
+
+/* Radio & checkbox en vert GDF (au lieu de rouge) */
+section[data-testid="stSidebar"] input[type="radio"],
+section[data-testid="stSidebar"] input[type="checkbox"] { accent-color:#00653F !important; }
+
+/* Champs texte/numériques: bordure/focus en vert */
+section[data-testid="stSidebar"] input:focus,
+section[data-testid="stSidebar"] textarea:focus { border-color:#00653F !important; box-shadow:0 0 0 2px rgba(0,101,63,0.35) !important; outline:none !important; }
+
+/* Boutons + / - des number_input en vert */
+section[data-testid="stSidebar"] div[data-testid="stNumberInput"] button { background:#4BAB77 !important; border-color:#4BAB77 !important; color:#FFFFFF !important; }
+
+/* Force la ligne GDF en vert (tous tableaux rendus) */
+.gdf-table .row-gdf td { background:#4BAB77 !important; color:#FFFFFF !important; font-weight:700; }
+
+/* Titre-badge vert lisible en blanc */
+.gdf-btn-title { color:#FFFFFF !important; }
+.gdf-table th { white-space: normal; line-height: 1.25; text-align: left; }
+.gdf-table th small { font-weight: 400; color: #5f6c72; }
+
+/* Différenciation des colonnes Net / Total */
+.gdf-table td.col-net { background:#E7F4EC; color:#000; font-weight:700; }
+.gdf-table td.col-total { background:#ECF7F1; color:#000; font-weight:700; }
+</style>
+"""
+
+
+@st.cache_resource
+def _custom_css(green: str, text_on_green: str) -> str:
+    """Feuille de style GDF — interpolée une seule fois par session (singleton)."""
+    return f"""
 <style>
 /* Police Raleway partout */
 @import url('https://fonts.googleapis.com/css2?family=Raleway:wght@400;600;700&display=swap');
@@ -20,7 +71,7 @@ html, body, [class^="css"] {{ font-family: 'Raleway', -apple-system, BlinkMacSys
 
 /* Sidebar en vert GDF */
 section[data-testid="stSidebar"] > div {{
-  background:{GDF_GREEN}!important; color:#FFFFFF!important;
+  background:{green}!important; color:#FFFFFF!important;
 }}
 section[data-testid="stSidebar"] h1,
 section[data-testid="stSidebar"] h2,
@@ -32,7 +83,7 @@ section[data-testid="stSidebar"] span {{ color:#FFFFFF!important; }}
 /* Titres façon bouton (texte noir sur vert) */
 .gdf-btn-title {{
   display:inline-block; padding:10px 16px; border-radius:9999px;
-  background:{GDF_GREEN}; color:{GDF_TEXT_ON_GREEN}; font-weight:700;
+  background:{green}; color:{text_on_green}; font-weight:700;
   letter-spacing:.2px; box-shadow:0 2px 6px rgba(0,0,0,.08);
 }}
 
@@ -41,149 +92,104 @@ section[data-testid="stSidebar"] span {{ color:#FFFFFF!important; }}
 .gdf-table th, .gdf-table td {{ padding:10px 12px; border-bottom:1px solid #eee; text-align:right; }}
 .gdf-table th:first-child, .gdf-table td:first-child {{ text-align:left; }}
 .gdf-table thead th {{ background:#fafafa; position:sticky; top:0; z-index:1; }}
-.gdf-table .row-gdf td {{ background:{GDF_GREEN}; color:#FFFFFF; font-weight:700; }}
+.gdf-table .row-gdf td {{ background:{green}; color:#FFFFFF; font-weight:700; }}
 .gdf-table td.col-highlight {{ background:#E3F2EA; color:#000; font-weight:700; }}
-.badge-gdf {{ display:inline-block; padding:2px 8px; border-radius:999px; background:{GDF_GREEN}; color:#000; font-size:.80rem; margin-left:6px; border:1px solid rgba(0,0,0,.15); }}
+.badge-gdf {{ display:inline-block; padding:2px 8px; border-radius:999px; background:{green}; color:#000; font-size:.80rem; margin-left:6px; border:1px solid rgba(0,0,0,.15); }}
 /* Forcer la couleur des sélecteurs (accent #00653F) */
 section[data-testid="stSidebar"] .stSelectbox div[data-baseweb="select"] > div {{ border-color:#00653F!important; }}
 section[data-testid="stSidebar"] .stSelectbox svg {{ fill:#00653F!important; color:#00653F!important; }}
 </style>
-"""
-
-# ==========================
-#  Modèle
-# ==========================
-FeeMode = Literal["percentage", "fixed"]
-
-@dataclass
-class Platform:
-    name: str
-    host_commission_pct: float          # % côté hôte
-    client_fee_mode: FeeMode            # "percentage" ou "fixed"
-    client_fee_value: float             # % si percentage, € si fixed
-    client_fee_floor_eur: float = 0.0   # plancher quand percentage
-    client_fee_cap_eur: Optional[float] = None  # plafond quand percentage (None = pas de plafond)
-
-    def client_fee_amount(self, sale_price: float) -> float:
-        """Frais client en € selon le mode, avec plancher/plafond éventuels."""
-        if self.client_fee_mode == "percentage":
-            pct_val = sale_price * (self.client_fee_value / 100.0)
-            floor = float(self.client_fee_floor_eur or 0.0)
-            cap = float(self.client_fee_cap_eur) if self.client_fee_cap_eur is not None else None
-            fee = max(pct_val, floor)
-            if cap is not None:
-                fee = min(fee, cap)
-            return fee
-        return self.client_fee_value
-
-    def base_before_client_fees(self, sale_price: float) -> float:
-        return sale_price - self.client_fee_amount(sale_price)
-
-    def host_net(self, sale_price: float) -> float:
-        base = self.base_before_client_fees(sale_price)
-        return base * (1 - self.host_commission_pct / 100.0)
-
-# --- Inversion pour retrouver P (prix public) à partir du net N ---
-
-def _solve_price_from_net_percentage(N: float, h: float, cp: float, floor: float, cap: Optional[float]) -> float:
-    """Résout P pour N avec frais client en %, incluant plancher/plafond.
-    Régimes testés: floor, plafond, proportionnel. On retourne le P cohérent minimal.
-    """
-    candidates: List[Tuple[float, str]] = []
-    # 1) plancher actif
-    P_floor = N / (1 - h) + floor
-    if cp * P_floor <= floor + 1e-9:
-        candidates.append((P_floor, "floor"))
-    # 2) plafond actif
-    if cap is not None:
-        P_cap = N / (1 - h) + cap
-        if cp * P_cap >= cap - 1e-9:
-            candidates.append((P_cap, "cap"))
-    # 3) proportionnel
-    denom = (1 - cp) * (1 - h)
-    if denom <= 0:
-        denom = 1e-12
-    P_pct = N / denom
-    ok_low = (cp * P_pct >= floor - 1e-9)
-    ok_high = True if cap is None else (cp * P_pct <= cap + 1e-9)
-    if ok_low and ok_high:
-        candidates.append((P_pct, "pct"))
-    return min((p for p, _ in candidates), default=max(P_floor, P_pct))
-
-
-def price_from_net(platform: Platform, net: float) -> float:
-    h = platform.host_commission_pct / 100.0
-    if platform.client_fee_mode == "percentage":
-        cp = platform.client_fee_value / 100.0
-        floor = float(platform.client_fee_floor_eur or 0.0)
-        cap = float(platform.client_fee_cap_eur) if platform.client_fee_cap_eur is not None else None
-        return _solve_price_from_net_percentage(net, h, cp, floor, cap)
-    else:
-        # frais fixe f : N = (P - f)*(1-h)  =>  P = f + N/(1-h)
-        denom = (1 - h)
-        return (platform.client_fee_value + net / denom) if denom != 0 else float("inf")
-
-# ==========================
-#  Config (plateformes figées, sauf GDF)
-# ==========================
-GDF_DEFAULT = Platform(
-    name="Gîtes de France",
-    host_commission_pct=15.0,
-    client_fee_mode="fixed",
-    client_fee_value=15.0,
-)
-
-FIXED_PLATFORMS: List[Platform] = [
-    Platform("Tripadvisor / FlipKey", host_commission_pct=3.0,  client_fee_mode="percentage", client_fee_value=12.0),
-    Platform("Airbnb host-only",      host_commission_pct=15.5, client_fee_mode="percentage", client_fee_value=0.0),
-    Platform("Vrbo / Abritel",        host_commission_pct=8.0,  client_fee_mode="percentage", client_fee_value=14.26),
-    Platform("Airbnb split",          host_commission_pct=3.0,  client_fee_mode="percentage", client_fee_value=15.0),
-    Platform("Booking.com",           host_commission_pct=17.0, client_fee_mode="percentage", client_fee_value=0.0),
-    Platform("Holidu",                host_commission_pct=25.0, client_fee_mode="percentage", client_fee_value=0.0),
-]
+""" + _OVERRIDES_CSS
 
 # ==========================
 #  Calculs & Rendu tableau
 # ==========================
 
-def compute_table(platforms: List[Platform], input_mode: str, input_value: float) -> pd.DataFrame:
-    rows: List[Dict[str, float | str]] = []
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def compute_table(platform_spec: Tuple[PlatformSpec, ...], input_mode: str,
+                  input_value: float) -> Tuple[pd.DataFrame, Tuple[bool, ...]]:
+    platforms = [Platform(*spec) for spec in platform_spec]
+    arr = _platforms_to_arrays(platforms)
+    n = len(platforms)
+    h = arr.host_pct / 100.0
+    cfv = arr.fee_value
+    is_pct = arr.is_pct
+    floor = arr.floor
+    cap = arr.cap
+
+    # Prix public P (vecteur, un par plateforme)
+    if input_mode == "price_client":
+        P = np.full(n, float(input_value))
+    else:
+        P = _solve_prices_from_net(arr, float(input_value))
+
+    # Frais / base / commission / net : tout en vectoriel
+    pct_fee = np.clip(P * cfv / 100.0, floor, cap)
+    client_fee = np.where(is_pct, pct_fee, cfv)
+    base = P - client_fee
+    host_fee_eur = base * h
+    net = base - host_fee_eur
+
+    # Méthodes textuelles séparées (une par plateforme)
+    client_methods: List[str] = []
+    host_methods: List[str] = []
     for p in platforms:
-        h = p.host_commission_pct / 100.0
-        # Prix public P
-        if input_mode == "price_client":
-            P = float(input_value)
-        else:
-            P = price_from_net(p, float(input_value))
-        # Frais / base / commission / net
-        client_fee = p.client_fee_amount(P)
-        base = P - client_fee
-        host_fee_eur = base * h
-        net = base - host_fee_eur
-        # Méthodes textuelles séparées
         client_method = (
             f"pourcentage du prix de vente ({p.client_fee_value:g}%)"
-            + (f", plancher {p.client_fee_floor_eur:g} €" if getattr(p, 'client_fee_floor_eur', 0) else "")
-            + (f", plafond {p.client_fee_cap_eur:g} €" if getattr(p, 'client_fee_cap_eur', None) is not None else "")
+            + (f", plancher {p.client_fee_floor_eur:g} €" if p.client_fee_floor_eur else "")
+            + (f", plafond {p.client_fee_cap_eur:g} €" if p.client_fee_cap_eur is not None else "")
             if p.client_fee_mode == "percentage" else f"forfait fixe ({p.client_fee_value:g} €)"
         )
         host_method = f"commission propriétaire {p.host_commission_pct:g}%"
         if p.name in ("Vrbo / Abritel", "Booking.com"):
             host_method += " — frais d'encaissement inclus"
-        rows.append({
-            "Plateforme": p.name,
-            "Net propriétaire (Loyers hors frais de commercialisation)": round(net, 2),
-            "Méthode commission propriétaire": host_method,
-            "Frais propriétaire (€)": round(host_fee_eur, 2),
-            "Méthode frais client": client_method,
-            "Frais clients (€)": round(client_fee, 2),
-            "Total client (Frais de commercialisation inclus)": round(P, 2),
-        })
-    df = pd.DataFrame(rows)
+        client_methods.append(client_method)
+        host_methods.append(host_method)
+
+    # Classement calculé directement sur les tableaux (np.lexsort : la
+    # dernière clé est la clé primaire ; nom croissant pour briser les égalités)
+    names_arr = np.array(arr.names)
+    net_r = np.round(net, 2)
+    host_fee_r = np.round(host_fee_eur, 2)
+    client_fee_r = np.round(client_fee, 2)
+    P_r = np.round(P, 2)
+    if input_mode == "net_host":
+        order = np.lexsort((names_arr, P_r, -net_r))
+    else:
+        order = np.lexsort((names_arr, -net_r, P_r))
+
+    df = pd.DataFrame({
+        "Plateforme": names_arr[order],
+        "Net propriétaire (Loyers hors frais de commercialisation)": net_r[order],
+        "Méthode commission propriétaire": np.array(host_methods)[order],
+        "Frais propriétaire (€)": host_fee_r[order],
+        "Méthode frais client": np.array(client_methods)[order],
+        "Frais clients (€)": client_fee_r[order],
+        "Total client (Frais de commercialisation inclus)": P_r[order],
+    })
+    # Appartenance GDF calculée une fois, alignée sur l'ordre des lignes
+    # (le renderer n'a plus à renifler les noms, et le badge survit au renommage)
+    is_gdf = tuple(bool(str(nm).lower().startswith("gîtes de france")) for nm in names_arr[order])
+    return df, is_gdf
+
+
+def apply_display_name(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Substitue le nom GDF saisi dans le tableau déjà calculé.
+
+    Étape volontairement hors cache : taper un nom dans la sidebar ne doit
+    invalider que ce renommage bon marché, pas le calcul numérique.
+    """
+    if name and name != GDF_DEFAULT.name:
+        df = df.copy()
+        df.loc[df["Plateforme"] == GDF_DEFAULT.name, "Plateforme"] = name
     return df
 
 
-def table_to_html(df: pd.DataFrame) -> str:
+# Le HTML est déterministe en fonction du DataFrame : on le met en cache
+# (les DataFrames se hachent lentement par défaut, d'où le hash_funcs explicite)
+@st.cache_data(show_spinner=False,
+               hash_funcs={pd.DataFrame: lambda d: pd.util.hash_pandas_object(d, index=True).values.tobytes()})
+def table_to_html(df: pd.DataFrame, is_gdf_mask: Tuple[bool, ...]) -> str:
     # En-têtes multilignes pour une lecture plus claire
     header_map = {
         "Plateforme": "Plateforme",
@@ -194,28 +200,37 @@ def table_to_html(df: pd.DataFrame) -> str:
         "Frais clients (€)": "Frais<br>clients (€)",
         "Total client (Frais de commercialisation inclus)": "Total client<br><small>(Frais de commercialisation inclus)</small>",
     }
-    thead = "<thead><tr>" + "".join(f"<th>{header_map.get(col, col)}</th>" for col in df.columns) + "</tr></thead>"
-    rows_html = []
-    for _, row in df.iterrows():
-        is_gdf = str(row["Plateforme"]).lower().startswith("gîtes de france")
+    # Fragments accumulés à plat, un seul join terminal (pas de joins imbriqués)
+    parts: List[str] = ["<div class='gdf-table'><table><thead><tr>"]
+    parts.extend(f"<th>{header_map.get(col, col)}</th>" for col in df.columns)
+    parts.append("</tr></thead><tbody>")
+    # Formatage colonne par colonne (pas d'iterrows ni d'isinstance par cellule)
+    formatted: Dict[str, List[str]] = {}
+    col_cls: Dict[str, str] = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == "f":
+            formatted[col] = _fmt_fr(values)
+        else:
+            formatted[col] = [str(v) for v in values]
+        cls = ""
+        if str(col).startswith("Net propriétaire ("):
+            cls = "col-net"
+        elif str(col).startswith("Total client ("):
+            cls = "col-total"
+        col_cls[col] = cls
+    names = df["Plateforme"].to_numpy()
+    for i in range(len(df)):
+        name_l = str(names[i]).lower().strip()
+        is_gdf = is_gdf_mask[i]
         tr_class = "row-gdf" if is_gdf else ""
-        tds = []
+        parts.append(f"<tr class='{tr_class}'>")
         for col in df.columns:
-            val = row[col]
-            if isinstance(val, float):
-                text = f"{val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            else:
-                text = str(val)
-            cls = ""
-            if str(col).startswith("Net propriétaire ("):
-                cls = "col-net"
-            elif str(col).startswith("Total client ("):
-                cls = "col-total"
+            text = formatted[col][i]
             if col == "Plateforme":
                 # Badge GDF
                 if is_gdf:
                     text = f"{text} <span class='badge-gdf'>GDF</span>"
-                name_l = str(row["Plateforme"]).lower().strip()
                 # * pour Airbnb host-only (simplified pricing)
                 if name_l == "airbnb host-only":
                     text = f"{text}<sup>*</sup>"
@@ -225,47 +240,16 @@ def table_to_html(df: pd.DataFrame) -> str:
                 # ‡ pour Booking.com (taux inclut frais d'encaissement)
                 if name_l == "booking.com":
                     text = f"{text}<sup>‡</sup>"
-            tds.append(f"<td class='{cls}'>{text}</td>")
-        rows_html.append(f"<tr class='{tr_class}'>" + "".join(tds) + "</tr>")
-    tbody = "<tbody>" + "".join(rows_html) + "</tbody>"
-    return f"<div class='gdf-table'><table>{thead}{tbody}</table></div>"
+            parts.append(f"<td class='{col_cls[col]}'>{text}</td>")
+        parts.append("</tr>")
+    parts.append("</tbody></table></div>")
+    return "".join(parts)
 
 # ==========================
 #  UI
 # ==========================
 st.set_page_config(page_title="Comparateur de plateformes — Gîtes de France", layout="wide")
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
-# Overrides CSS ciblés (pas de f-string -> pas besoin de doubler les accolades)
-st.markdown("""
-<style>
-/* Couleur primaire Streamlit (impacte radio/checkbox/accents) */
-:root { --primary-color: #00653F; }
-
-/* Accent sélecteurs (dropdowns) dans la sidebar */
-section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] > div { border-color:#00653F !important; box-shadow:0 0 0 1px #00653F1A !important; }
-section[data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] > div:focus { box-shadow:0 0 0 2px #00653F66 !important; border-color:#00653F !important; }
-section[data-testid="stSidebar"] .stSelectbox svg { color:#00653F !important; fill:#00653F !important; }
-
-/* Radio & checkbox en vert GDF (au lieu de rouge) */
-section[data-testid="stSidebar"] input[type="radio"],
-section[data-testid="stSidebar"] input[type="checkbox"] { accent-color:#00653F !important; }
-
-/* Champs texte/numériques: bordure/focus en vert */
-section[data-testid="stSidebar"] input:focus, 
-section[data-testid="stSidebar"] textarea:focus { border-color:#00653F !important; box-shadow:0 0 0 2px rgba(0,101,63,0.35) !important; outline:none !important; }
-
-/* Boutons + / - des number_input en vert */
-section[data-testid="stSidebar"] div[data-testid="stNumberInput"] button { background:#4BAB77 !important; border-color:#4BAB77 !important; color:#FFFFFF !important; }
-
-/* Force la ligne GDF en vert (tous tableaux rendus) */
-.gdf-table .row-gdf td { background:#4BAB77 !important; color:#FFFFFF !important; font-weight:700; }
-
-/* Titre-badge vert lisible en blanc */
-.gdf-btn-title { color:#FFFFFF !important; }
-.gdf-table th { white-space: normal; line-height: 1.25; text-align: left; }
-.gdf-table th small { font-weight: 400; color: #5f6c72; }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(_custom_css(GDF_GREEN, GDF_TEXT_ON_GREEN), unsafe_allow_html=True)
 
 # Titre haut : Classement
 st.title("🏆 Comparateurs de frais de réservation")
@@ -306,40 +290,27 @@ with st.sidebar:
         input_mode = "net_host"
         input_value = st.number_input("Tarif net propriétaire", min_value=0.0, step=50.0, value=850.0)
 
-# Instancier GDF selon les entrées
+# Instancier GDF selon les entrées. Le nom canonique sert de clé de cache :
+# le nom affiché est substitué après coup (voir apply_display_name).
 GDF = Platform(
-    name=gdf_name,
+    name=GDF_DEFAULT.name,
     host_commission_pct=host_commission_pct,
     client_fee_mode=client_fee_mode,
     client_fee_value=client_fee_value,
     client_fee_floor_eur=client_fee_floor_eur,
     client_fee_cap_eur=client_fee_cap_eur,
 )
-PLATFORMS: List[Platform] = [GDF] + FIXED_PLATFORMS
-
-# Calcul principal
-DF = compute_table(PLATFORMS, input_mode, input_value)
-
-# ===== Classement dynamique (même logique que les anciens tableaux) =====
-# Classement global (GDF inclus) + brisage d'égalité comme dans les anciens tableaux
-if input_mode == "net_host":
-    sort_cols = ["Net propriétaire (Loyers hors frais de commercialisation)", "Total client (Frais de commercialisation inclus)", "Plateforme"]
-    sort_asc  = [False, True, True]
-else:
-    sort_cols = ["Total client (Frais de commercialisation inclus)", "Net propriétaire (Loyers hors frais de commercialisation)", "Plateforme"]
-    sort_asc  = [True, False, True]
-DF = DF.sort_values(sort_cols, ascending=sort_asc).reset_index(drop=True)
-
-# Affichage du tableau principal
-# styles de différenciation pour les colonnes Net / Total
-st.markdown("""
-<style>
-.gdf-table td.col-net { background:#E7F4EC; color:#000; font-weight:700; }
-.gdf-table td.col-total { background:#ECF7F1; color:#000; font-weight:700; }
-</style>
-""", unsafe_allow_html=True)
+PLATFORMS: List[Platform] = [GDF, *FIXED_PLATFORMS]
+
+# Calcul principal (mis en cache : seuls des changements d'entrées recalculent).
+# Le classement (net décroissant / total croissant selon la méthode de saisie,
+# nom en brisage d'égalité) est déjà appliqué au niveau des tableaux NumPy.
+DF, IS_GDF = compute_table(_platform_spec(PLATFORMS), input_mode, input_value)
+DF = apply_display_name(DF, gdf_name)
 
-st.markdown(table_to_html(DF), unsafe_allow_html=True)
+# Affichage du tableau principal (les styles col-net/col-total font partie
+# du bloc CSS unique injecté en tête de script)
+st.markdown(table_to_html(DF, IS_GDF), unsafe_allow_html=True)
 
 # Notes de bas de tableau
 st.markdown("""